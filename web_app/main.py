@@ -1,12 +1,32 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
+from email.utils import formatdate
 import os
+import stat
+import bisect
 from datetime import datetime, timedelta
-import glob
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import time
+import hashlib
+import logging
+import asyncio
+from contextlib import asynccontextmanager
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Arranca el refresco del índice de videos al iniciar y lo detiene al apagar."""
+    await start_refresh_loop()
+    yield
+    await stop_refresh_loop()
+
+
+# orjson serializa las listas de videos bastante más rápido que json estándar
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # CONFIGURACIÓN - IMPORTANTE: AJUSTA ESTA RUTA
 VIDEO_ROOT_DIR = "/media/diego/camaras"  # El directorio raíz que contiene las carpetas CamX_YYYY-MM-DD
@@ -16,45 +36,89 @@ CAMERAS = ["Cam1", "Cam2"]
 DATE_FORMAT = "%Y-%m-%d"
 FOLDER_PATTERN = r"(Cam\d+)_(\d{4}-\d{2}-\d{2})" # Patrón para la carpeta (ej: Cam1_2025-12-08)
 
+# Expresiones regulares precompiladas (se usan para cada archivo escaneado)
+_FOLDER_RE = re.compile(FOLDER_PATTERN)
+# Patrón típico del nombre de archivo: YYYY-MM-DD_HH-MM-SS
+_TIME_RE = re.compile(r'(\d{4}-\d{2}-\d{2})_(\d{2}-\d{2}-\d{2})')
+
 # Servir archivos estáticos
 # (Asumiendo que 'static' está en el mismo nivel que este script)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 
-def extract_info_from_path(file_path):
+def parse_filename_time(filename):
+    """Parsea el prefijo YYYY-MM-DD_HH-MM-SS del nombre de archivo sin usar regex.
+
+    Devuelve None si el nombre no empieza exactamente con ese formato.
+    """
+    s = filename[:19]
+    if len(s) != 19 or s[4] != '-' or s[7] != '-' or s[10] != '_' or s[13] != '-' or s[16] != '-':
+        return None
     try:
-        # Extraer el path relativo al directorio raíz
-        relative_path = os.path.relpath(file_path, VIDEO_ROOT_DIR)
-        
-        # Obtener la carpeta principal (ej. Cam1_2025-12-08)
-        folder_name = relative_path.split(os.sep)[0]
-        filename = os.path.basename(file_path)
-
-        # 1. Extraer CamID y Fecha de la carpeta (mantenemos esto para el filtrado)
-        match = re.match(FOLDER_PATTERN, folder_name)
-        if not match:
-            print(f"Error: La carpeta {folder_name} no coincide con el patrón esperado.")
-            return None
+        # Construcción directa por posiciones: mucho más barato que strptime
+        return datetime(int(s[0:4]), int(s[5:7]), int(s[8:10]),
+                        int(s[11:13]), int(s[14:16]), int(s[17:19]))
+    except ValueError:
+        pass
+    try:
+        return datetime.strptime(s, "%Y-%m-%d_%H-%M-%S")
+    except ValueError:
+        return None
 
-        camera_id = match.group(1) # Ej: Cam1
-        date_folder_str = match.group(2)   # Ej: 2025-12-08
-        
-        # 2. Intentar extraer el timestamp completo del NOMBRE DEL ARCHIVO
-        # Patrón típico: YYYY-MM-DD_HH-MM-SS
-        time_match = re.search(r'(\d{4}-\d{2}-\d{2})_(\d{2}-\d{2}-\d{2})', filename)
+
+def parse_folder_name(folder_name):
+    """Extrae (CamID, fecha) del nombre de carpeta CamX_YYYY-MM-DD.
+
+    Se llama una vez por carpeta en scan_video_dir, no por archivo.
+    """
+    # Formato rígido: basta con partir por '_' y validar posiciones fijas
+    cam, sep, date = folder_name.partition('_')
+    if not sep or not cam.startswith("Cam") or len(date) != 10 or date[4] != '-' or date[7] != '-':
+        logger.debug("La carpeta %s no coincide con el patrón esperado.", folder_name)
+        return None
+
+    return cam, date
+
+
+def extract_info_from_path(file_entry: os.DirEntry, folder_name, camera_id, date_folder_str):
+    try:
+        # file_entry es un os.DirEntry obtenido con os.scandir: un único stat()
+        # (cacheado en el propio objeto) sirve para el tamaño y el mtime
+        file_path = file_entry.path
+        st = file_entry.stat()
+
+        # La carpeta (ej. Cam1_2025-12-08) y su CamID/fecha ya vienen parseados
+        # desde scan_video_dir, una sola vez por carpeta
+        filename = file_entry.name
+
+        # Nombres que no son UTF-8 válido (scandir los devuelve con surrogates)
+        # no se pueden enviar en el JSON ni en las cabeceras: se omiten
+        try:
+            filename.encode()
+        except UnicodeEncodeError:
+            logger.warning("Se omite %r: el nombre no es UTF-8 válido", file_entry.path)
+            return None
         
-        if time_match:
-             # Si encontramos el patrón completo: YYYY-MM-DD_HH-MM-SS
-             date_part = time_match.group(1)
-             time_part = time_match.group(2).replace('-', ':') # Convertir 17-46-33 a 17:46:33
-             datetime_str = f"{date_part} {time_part}"
-             # Usamos el formato completo para parsear
-             file_time = datetime.strptime(datetime_str, "%Y-%m-%d %H:%M:%S")
-             
-        else:
-             # Si el nombre del archivo no tiene fecha/hora clara, usar el mtime
-             # y la fecha de la carpeta para ser consistente.
-             file_time = datetime.fromtimestamp(os.path.getmtime(file_path))
+        # Intentar extraer el timestamp completo del NOMBRE DEL ARCHIVO
+        # Patrón típico: YYYY-MM-DD_HH-MM-SS (caso habitual: al inicio del nombre)
+        file_time = parse_filename_time(filename)
+
+        if file_time is None:
+            # Si no está al inicio, buscar el patrón en cualquier parte del nombre
+            time_match = _TIME_RE.search(filename)
+
+            if time_match:
+                 # Si encontramos el patrón completo: YYYY-MM-DD_HH-MM-SS
+                 date_part = time_match.group(1)
+                 time_part = time_match.group(2).replace('-', ':') # Convertir 17-46-33 a 17:46:33
+                 datetime_str = f"{date_part} {time_part}"
+                 # Usamos el formato completo para parsear
+                 file_time = datetime.strptime(datetime_str, "%Y-%m-%d %H:%M:%S")
+
+            else:
+                 # Si el nombre del archivo no tiene fecha/hora clara, usar el mtime
+                 # y la fecha de la carpeta para ser consistente.
+                 file_time = datetime.fromtimestamp(st.st_mtime)
              
         # El "nombre de archivo" único para el front-end será la ruta relativa
         unique_filename = os.path.join(folder_name, filename).replace(os.sep, '__')
@@ -63,35 +127,463 @@ def extract_info_from_path(file_path):
             "camera_id": camera_id,
             "date": date_folder_str, # Usamos la fecha de la carpeta para el índice de fechas
             "timestamp": file_time,
+            # Timestamp en formato ISO para el JSON y en segundos epoch para
+            # comparar con enteros en las consultas
+            "timestamp_iso": file_time.isoformat(),
+            "ts_epoch": int(file_time.timestamp()),
             "filename": filename,
             "unique_path": unique_filename, 
-            "full_path": file_path
+            "full_path": file_path,
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "size_mb": round(st.st_size / (1024 * 1024), 2)
         }
-    except Exception as e:
-        # Imprimir el error con más contexto, incluyendo el string que falló, si aplica
-        print(f"Error al extraer info de {file_path}: {e}")
+    except (ValueError, OverflowError, OSError) as e:
+        # Fecha inválida o fuera de rango, o archivo borrado durante el escaneo
+        logger.debug("Error al extraer info de %s: %s", file_entry.path, e)
         return None
 
-def find_all_video_files():
-    """Busca recursivamente todos los videos en la nueva estructura de carpetas."""
-    all_video_data = []
-    
-    # Patrón de búsqueda para todas las carpetas que coincidan con CamX_YYYY-MM-DD
-    # y los archivos .mp4 dentro de ellas
-    # Ejemplo de patrón: /media/diego/camaras/Cam*_????-??-??/*.mp4
-    search_pattern = os.path.join(VIDEO_ROOT_DIR, f"Cam*_{DATE_FORMAT.replace('%Y', '????').replace('%m', '??').replace('%d', '??')}", f"*{VIDEO_EXTENSION}")
-    
-    print(f"Patrón de búsqueda: {search_pattern}")
-
-    for file_path in glob.glob(search_pattern):
-        video_data = extract_info_from_path(file_path)
-        if video_data:
-            # Añadir tamaño y timestamp en formato ISO para el JSON
-            video_data["size_mb"] = round(os.path.getsize(file_path) / (1024 * 1024), 2)
-            video_data["timestamp_iso"] = video_data["timestamp"].isoformat()
-            all_video_data.append(video_data)
-            
-    return all_video_data
+def list_video_dirs():
+    """Lista las carpetas CamX_YYYY-MM-DD del directorio raíz (como os.DirEntry)."""
+    video_dirs = []
+
+    with os.scandir(VIDEO_ROOT_DIR) as top:
+        for dir_entry in top:
+            # Descartar primero por prefijo (comparación de bytes, sin regex)
+            if not dir_entry.name.startswith("Cam"):
+                continue
+            # is_dir() usa el tipo cacheado por scandir, sin stat() adicional
+            if not dir_entry.is_dir(follow_symlinks=False):
+                continue
+            if not _FOLDER_RE.fullmatch(dir_entry.name):
+                continue
+            video_dirs.append(dir_entry)
+
+    return video_dirs
+
+
+def scan_video_dir(dir_path):
+    """Extrae la información de todos los videos de una carpeta CamX_YYYY-MM-DD."""
+    video_data_list = []
+
+    # Extraer CamID y Fecha de la carpeta (mantenemos esto para el filtrado)
+    folder_name = os.path.basename(dir_path)
+    folder_info = parse_folder_name(folder_name)
+    if folder_info is None:
+        return video_data_list
+    camera_id, date_folder_str = folder_info # Ej: ("Cam1", "2025-12-08")
+
+    try:
+        inner = os.scandir(dir_path)
+    except OSError as e:
+        # La carpeta se ha borrado (o desmontado) entre el listado y el escaneo
+        logger.debug("No se pudo escanear %s: %s", dir_path, e)
+        return video_data_list
+
+    with inner:
+        for file_entry in inner:
+            if not file_entry.name.endswith(VIDEO_EXTENSION):
+                continue
+            video_data = extract_info_from_path(file_entry, folder_name, camera_id, date_folder_str)
+            if video_data:
+                # Versión pública (la que se envía en JSON), construida una sola vez
+                video_data["public"] = {
+                    "camera_id": video_data["camera_id"],
+                    "date": video_data["date"],
+                    "filename": video_data["unique_path"], # Usar la ruta única para el frontend
+                    "timestamp": video_data["timestamp_iso"],
+                    "size_mb": video_data["size_mb"]
+                }
+                video_data_list.append(video_data)
+
+    return video_data_list
+
+
+# Pool compartido para escanear carpetas CamX_YYYY-MM-DD en paralelo: cada
+# escaneo está limitado por la latencia de scandir/stat (que liberan el GIL),
+# lo que se nota sobre todo en almacenamiento en red.
+_SCAN_POOL = ThreadPoolExecutor(max_workers=8)
+
+
+# ---- CACHÉ DEL LISTADO DE VIDEOS ----
+# Evita volver a recorrer todo el árbol de carpetas en cada petición a la API.
+# El listado se reutiliza mientras no caduque el TTL y no cambie el mtime del
+# directorio raíz; al refrescar solo se vuelven a escanear las carpetas
+# CamX_YYYY-MM-DD cuyo mtime haya cambiado.
+# Junto al listado se guardan índices precalculados para que los endpoints
+# respondan con una búsqueda en diccionario en lugar de recorrer todos los videos.
+
+_VIDEO_CACHE = {"root": None, "data": None, "index": None, "ts": 0.0, "root_mtime": 0, "dirs": {}}
+_VIDEO_CACHE_LOCK = threading.Lock()
+
+
+def build_video_index(videos):
+    """Construye los índices de consulta a partir del listado de videos.
+
+    Las claves de cámara se guardan en minúsculas (el filtrado es insensible a
+    mayúsculas); la clave None agrupa todas las cámaras. Las listas contienen
+    directamente los diccionarios públicos de cada video.
+    """
+    sorted_by_ts = sorted(videos, key=lambda v: v["ts_epoch"])
+
+    by_camera = {}
+    # Timestamps (epoch) paralelos a cada lista de by_camera para poder usar bisect
+    ts_by_camera = {}
+    by_date_camera = {}
+    dates_by_camera = {}
+    # Ruta única -> ruta física: solo se sirven archivos presentes en el catálogo
+    by_unique_path = {}
+
+    # Al recorrer en orden cronológico, todas las listas quedan ya ordenadas
+    for video in sorted_by_ts:
+        public = video["public"]
+        for cam_key in (None, video["camera_id"].lower()):
+            by_camera.setdefault(cam_key, []).append(public)
+            ts_by_camera.setdefault(cam_key, []).append(video["ts_epoch"])
+            by_date_camera.setdefault((video["date"], cam_key), []).append(public)
+        dates_by_camera.setdefault(video["camera_id"], set()).add(video["date"])
+        by_unique_path[video["unique_path"]] = video["full_path"]
+
+    return {
+        "videos": videos,
+        "by_camera": by_camera,
+        "ts_by_camera": ts_by_camera,
+        "by_date_camera": by_date_camera,
+        "by_unique_path": by_unique_path,
+        # Fechas de cada cámara, la más reciente primero
+        "dates_by_camera": {cam_id: sorted(dates, reverse=True) for cam_id, dates in dates_by_camera.items()},
+    }
+
+
+def _scan_etag(dirs):
+    """ETag del escaneo, calculado a partir de lo escaneado (ruta, mtime y tamaño de cada video).
+
+    Así cambia también cuando se reescanea una carpeta cuyo mtime no ha
+    cambiado, p. ej. al terminar de escribirse un video.
+    """
+    h = hashlib.blake2b(digest_size=8)
+    for dir_path in sorted(dirs):
+        for video in dirs[dir_path][1]:
+            h.update(f'{video["unique_path"]}:{video["mtime_ns"]}:{video["size"]}\n'.encode(errors="surrogateescape"))
+    return h.hexdigest()
+
+
+def _empty_video_index():
+    """Índice sin ningún video."""
+    index = build_video_index([])
+    index["etag"] = _scan_etag({})
+    return index
+
+
+# Carpetas modificadas hace menos de esto se consideran "en grabación"
+ACTIVE_DIR_WINDOW = 3600
+
+
+def _active_video_dirs(video_dirs):
+    """Carpetas donde puede haber un video creciendo: la más reciente de cada
+    cámara y las modificadas en la última ACTIVE_DIR_WINDOW (p. ej. la del día
+    anterior justo después de medianoche)."""
+    now = time.time()
+    active = set()
+    newest = {}
+    for dir_path, dir_mtime in video_dirs:
+        if now - dir_mtime < ACTIVE_DIR_WINDOW:
+            active.add(dir_path)
+        # Los nombres CamX_YYYY-MM-DD ordenan por fecha dentro de cada cámara
+        camera_id = os.path.basename(dir_path).partition('_')[0]
+        if camera_id not in newest or dir_path > newest[camera_id]:
+            newest[camera_id] = dir_path
+    active.update(newest.values())
+    return active
+
+
+def _rebuild_video_index_locked():
+    """Vuelve a escanear (solo las carpetas modificadas) y publica un nuevo índice.
+
+    Debe llamarse con _VIDEO_CACHE_LOCK adquirido.
+    """
+    # Carpetas marcadas por inotify: se reescanean aunque su mtime no cambie
+    # (p. ej. al terminar de escribirse un video, que no modifica la carpeta).
+    # Se consumen antes de nada para que el evento quede limpio también si el
+    # directorio raíz ha desaparecido.
+    with _DIRTY_LOCK:
+        dirty_dirs = _DIRTY_DIRS | _UNWATCHED_DIRS
+        _DIRTY_DIRS.clear()
+        _INDEX_DIRTY.clear()
+
+    try:
+        root_mtime = os.stat(VIDEO_ROOT_DIR).st_mtime
+    except OSError:
+        # El directorio raíz no existe (p. ej. disco desmontado)
+        index = _empty_video_index()
+        _VIDEO_CACHE.update(root=VIDEO_ROOT_DIR, data=[], index=index, ts=time.monotonic(),
+                            root_mtime=None, dirs={})
+        return index
+
+    video_dirs = []
+    for dir_entry in list_video_dirs():
+        try:
+            video_dirs.append((dir_entry.path, dir_entry.stat().st_mtime))
+        except OSError:
+            continue
+
+    # Sin inotify, un video que se sigue grabando no cambia el mtime de su
+    # carpeta: reescanear siempre las carpetas donde se puede estar grabando
+    if _watcher_thread is None or not _watcher_thread.is_alive():
+        dirty_dirs |= _active_video_dirs(video_dirs)
+
+    # Reutilizar las carpetas ya escaneadas si su mtime no ha cambiado
+    previous_dirs = _VIDEO_CACHE["dirs"] if _VIDEO_CACHE["root"] == VIDEO_ROOT_DIR else {}
+    dirs = {}
+    to_scan = []
+
+    for dir_path, dir_mtime in video_dirs:
+        cached = previous_dirs.get(dir_path)
+        if cached is not None and cached[0] == dir_mtime and dir_path not in dirty_dirs:
+            dirs[dir_path] = cached
+        else:
+            to_scan.append((dir_path, dir_mtime))
+
+    # Las carpetas modificadas se escanean en paralelo
+    scanned = _SCAN_POOL.map(scan_video_dir, [dir_path for dir_path, _ in to_scan])
+    for (dir_path, dir_mtime), videos in zip(to_scan, scanned):
+        dirs[dir_path] = (dir_mtime, videos)
+
+    all_video_data = [video for _, videos in dirs.values() for video in videos]
+
+    index = build_video_index(all_video_data)
+    index["etag"] = _scan_etag(dirs)
+    # Los lectores solo consultan _VIDEO_CACHE["index"], que se sustituye de una vez
+    _VIDEO_CACHE.update(root=VIDEO_ROOT_DIR, data=all_video_data, index=index, ts=time.monotonic(),
+                        root_mtime=root_mtime, dirs=dirs)
+    return index
+
+
+def _rebuild_video_index():
+    """Reconstruye el índice de videos sin tener en cuenta el TTL."""
+    with _VIDEO_CACHE_LOCK:
+        return _rebuild_video_index_locked()
+
+
+def _get_video_index(ttl=5.0):
+    """Devuelve los índices de videos usando la caché en memoria."""
+    # Con el refresco en segundo plano activo, las peticiones siempre leen la
+    # última instantánea y nunca pagan el coste del escaneo. Si todavía no hay
+    # ninguna (p. ej. el escaneo inicial falló) se responde con un índice vacío
+    # en lugar de escanear dentro de la petición.
+    if _refresh_task is not None:
+        index = _VIDEO_CACHE["index"]
+        return index if index is not None else _empty_video_index()
+
+    with _VIDEO_CACHE_LOCK:
+        try:
+            root_mtime = os.stat(VIDEO_ROOT_DIR).st_mtime
+        except OSError:
+            root_mtime = None
+
+        if (_VIDEO_CACHE["data"] is not None
+                and _VIDEO_CACHE["root"] == VIDEO_ROOT_DIR
+                and time.monotonic() - _VIDEO_CACHE["ts"] < ttl
+                and _VIDEO_CACHE["root_mtime"] == root_mtime):
+            return _VIDEO_CACHE["index"]
+
+        return _rebuild_video_index_locked()
+
+
+# ---- REFRESCO EN SEGUNDO PLANO ----
+# Una tarea asyncio reconstruye el índice cada REFRESH_INTERVAL segundos en un
+# hilo, de modo que la latencia de las peticiones no depende del escaneo.
+
+REFRESH_INTERVAL = 5.0
+_refresh_task = None
+
+
+async def _refresh_loop():
+    """Reconstruye periódicamente el índice de videos.
+
+    Si inotify está activo, solo se reconstruye cuando llega un evento del
+    sistema de archivos; si no, cada REFRESH_INTERVAL segundos.
+    """
+    global _watcher_thread
+    while True:
+        watching = _watcher_thread is not None and _watcher_thread.is_alive()
+        if _watcher_thread is not None and not watching and os.path.isdir(VIDEO_ROOT_DIR):
+            # El watcher se detuvo al desaparecer el directorio raíz: si ha
+            # vuelto, rearmarlo (el escaneo de abajo recoge lo que haya cambiado)
+            _watcher_thread = _start_watcher()
+            watching = _watcher_thread is not None
+            _mark_dirty()
+        if watching:
+            # El timeout permite cancelar la tarea al apagar el servidor; si hay
+            # carpetas sin vigilar, se refresca igualmente en cada intervalo
+            if not await asyncio.to_thread(_INDEX_DIRTY.wait, REFRESH_INTERVAL) and not _UNWATCHED_DIRS:
+                continue
+        try:
+            await asyncio.to_thread(_rebuild_video_index)
+        except Exception as e:
+            logger.warning("Error al refrescar el índice de videos: %s", e)
+        if not watching:
+            await asyncio.sleep(REFRESH_INTERVAL)
+
+
+# ---- INVALIDACIÓN CON INOTIFY ----
+# En Linux, un hilo escucha los eventos de creación/borrado/renombrado en el
+# directorio raíz y en cada carpeta CamX_YYYY-MM-DD, y marca como sucias solo
+# las carpetas afectadas. Si inotify no está disponible (otro sistema operativo,
+# falta inotify_simple, límite de watches...) se mantiene el refresco periódico.
+# En almacenamiento en red (NFS/SMB) inotify no ve los cambios hechos desde
+# otras máquinas: en ese caso hay que poner USE_INOTIFY = False.
+
+USE_INOTIFY = True
+
+_DIRTY_DIRS = set()
+# Carpetas que no se pudieron vigilar (p. ej. límite max_user_watches): se
+# reescanean en cada refresco periódico, como si no hubiera inotify
+_UNWATCHED_DIRS = set()
+_DIRTY_LOCK = threading.Lock()
+_INDEX_DIRTY = threading.Event()
+_watcher_thread = None
+
+
+def _mark_dirty(dir_path=None):
+    """Marca el índice (y opcionalmente una carpeta concreta) para reconstruir."""
+    with _DIRTY_LOCK:
+        if dir_path is not None:
+            _DIRTY_DIRS.add(dir_path)
+        _INDEX_DIRTY.set()
+
+
+def _watch_video_dirs(inotify, flags, root_wd, wd_to_dir):
+    """Bucle del hilo de inotify: traduce eventos en carpetas sucias.
+
+    Termina si el directorio raíz desaparece (p. ej. se desmonta el disco); el
+    bucle de refresco vuelve entonces al refresco periódico.
+    """
+    root_gone = flags.IGNORED | flags.UNMOUNT | flags.DELETE_SELF | flags.MOVE_SELF
+    while True:
+        for event in inotify.read():
+            if event.mask & flags.Q_OVERFLOW:
+                # Se han perdido eventos: volver a vigilar las carpetas actuales
+                # (puede haber nuevas) y reescanearlas todas
+                logger.warning("Cola de inotify desbordada, se reescanean todas las carpetas")
+                try:
+                    for dir_entry in list_video_dirs():
+                        _add_dir_watch(inotify, flags, dir_entry.path, wd_to_dir)
+                except OSError:
+                    pass
+                for dir_path in list(wd_to_dir.values()):
+                    _mark_dirty(dir_path)
+                _mark_dirty()
+                continue
+            if event.wd == root_wd and event.mask & root_gone:
+                logger.info("El directorio raíz ya no está vigilado, se usa refresco periódico")
+                inotify.close()
+                _mark_dirty()
+                return
+            if event.wd == root_wd:
+                # Nueva carpeta CamX_YYYY-MM-DD: empezar a vigilarla
+                if (event.mask & flags.ISDIR and event.mask & (flags.CREATE | flags.MOVED_TO)
+                        and _FOLDER_RE.fullmatch(event.name)):
+                    _add_dir_watch(inotify, flags, os.path.join(VIDEO_ROOT_DIR, event.name), wd_to_dir)
+                _mark_dirty()
+            elif event.mask & flags.IGNORED:
+                # La carpeta se ha borrado y el watch ya no existe
+                wd_to_dir.pop(event.wd, None)
+            elif event.wd in wd_to_dir and event.name.endswith(VIDEO_EXTENSION):
+                _mark_dirty(wd_to_dir[event.wd])
+
+
+def _add_dir_watch(inotify, flags, dir_path, wd_to_dir):
+    """Añade un watch sobre una carpeta CamX_YYYY-MM-DD."""
+    mask = flags.CREATE | flags.DELETE | flags.MOVED_TO | flags.MOVED_FROM | flags.CLOSE_WRITE
+    try:
+        wd_to_dir[inotify.add_watch(dir_path, mask)] = dir_path
+    except OSError as e:
+        logger.warning("No se pudo vigilar %s, se reescaneará periódicamente: %s", dir_path, e)
+        with _DIRTY_LOCK:
+            _UNWATCHED_DIRS.add(dir_path)
+        return
+    with _DIRTY_LOCK:
+        _UNWATCHED_DIRS.discard(dir_path)
+
+
+def _start_watcher():
+    """Arranca el hilo de inotify; devuelve None si no está disponible."""
+    if not USE_INOTIFY:
+        return None
+    try:
+        from inotify_simple import INotify, flags
+        inotify = INotify()
+        root_wd = inotify.add_watch(VIDEO_ROOT_DIR, flags.CREATE | flags.DELETE | flags.MOVED_TO | flags.MOVED_FROM
+                                    | flags.DELETE_SELF | flags.MOVE_SELF)
+    except (ImportError, OSError) as e:
+        logger.info("inotify no disponible, se usa refresco periódico: %s", e)
+        return None
+
+    wd_to_dir = {}
+    try:
+        for dir_entry in list_video_dirs():
+            _add_dir_watch(inotify, flags, dir_entry.path, wd_to_dir)
+    except OSError as e:
+        logger.info("inotify no disponible, se usa refresco periódico: %s", e)
+        inotify.close()
+        return None
+
+    thread = threading.Thread(target=_watch_video_dirs, args=(inotify, flags, root_wd, wd_to_dir),
+                              name="video-watcher", daemon=True)
+    thread.start()
+    return thread
+
+
+async def start_refresh_loop():
+    """Lanza el refresco periódico del índice de videos."""
+    global _refresh_task, _watcher_thread
+    # El watcher se arranca antes del escaneo inicial para no perder eventos
+    _watcher_thread = _start_watcher()
+    # Escaneo inicial antes de aceptar peticiones; si falla, el servidor arranca
+    # igualmente y el bucle de refresco lo volverá a intentar
+    try:
+        await asyncio.to_thread(_rebuild_video_index)
+    except Exception as e:
+        logger.warning("Error en el escaneo inicial de videos: %s", e)
+    _refresh_task = asyncio.create_task(_refresh_loop())
+
+
+async def stop_refresh_loop():
+    """Detiene el refresco periódico del índice de videos."""
+    global _refresh_task
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        _refresh_task = None
+
+
+def _get_videos_cached(ttl=5.0):
+    """Devuelve el listado de videos usando la caché en memoria."""
+    return _get_video_index(ttl)["videos"]
+
+
+# ---- CACHÉ HTTP DE LOS LISTADOS ----
+# Los paneles que consultan la API cada pocos segundos reciben un 304 si el
+# escaneo no ha cambiado, sin volver a serializar ni enviar el JSON.
+
+LIST_CACHE_CONTROL = "max-age=5"
+
+
+def etag_matches(request: Request, etag: str):
+    """Comprueba si la cabecera If-None-Match de la petición coincide con el ETag."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]
+
+
+def check_not_modified(request: Request, response: Response, etag: str):
+    """Devuelve un 304 si el cliente ya tiene la versión actual; si no, añade las cabeceras de caché."""
+    headers = {"ETag": etag, "Cache-Control": LIST_CACHE_CONTROL}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
 
 
 @app.get("/")
@@ -101,28 +593,24 @@ async def read_root():
 
 
 @app.get("/api/videos/recent")
-async def get_recent_videos(hours: int = 2, camera: str = None):
+async def get_recent_videos(request: Request, response: Response, hours: int = 2, camera: str = None):
     """Obtener videos de las últimas N horas, opcionalmente filtrados por cámara"""
     try:
-        cutoff_time = datetime.now() - timedelta(hours=hours)
-        videos = find_all_video_files()
-        filtered_videos = []
-        
-        for video in videos:
-            if video["timestamp"] >= cutoff_time:
-                # Filtrar por cámara si se especifica
-                if camera is None or video["camera_id"].lower() == camera.lower():
-                    filtered_videos.append({
-                        "camera_id": video["camera_id"],
-                        "date": video["date"],
-                        "filename": video["unique_path"], # Usar la ruta única para el frontend
-                        "timestamp": video["timestamp_iso"],
-                        "size_mb": video["size_mb"]
-                    })
-        
-        # Ordenar por timestamp (más reciente primero)
-        filtered_videos.sort(key=lambda x: x["timestamp"], reverse=True)
-        return filtered_videos
+        cutoff_epoch = int((datetime.now() - timedelta(hours=hours)).timestamp())
+        index = _get_video_index()
+        cam_key = camera.lower() if camera is not None else None
+
+        # Las listas están en orden cronológico: bisect localiza el corte
+        videos = index["by_camera"].get(cam_key, [])
+        start = bisect.bisect_left(index["ts_by_camera"].get(cam_key, []), cutoff_epoch)
+
+        # El resultado depende también del corte (los videos van saliendo de la ventana)
+        not_modified = check_not_modified(request, response, f'"{index["etag"]}-{start}"')
+        if not_modified:
+            return not_modified
+
+        # Más reciente primero
+        return videos[start:][::-1]
         
     except Exception as e:
         print(f"Error en get_recent_videos: {e}")
@@ -130,29 +618,22 @@ async def get_recent_videos(hours: int = 2, camera: str = None):
 
 
 @app.get("/api/videos/dates")
-async def get_available_dates(camera: str = None):
+async def get_available_dates(request: Request, response: Response, camera: str = None):
     """Obtener fechas disponibles, opcionalmente filtradas por cámara"""
     try:
-        videos = find_all_video_files()
-        dates_cameras = set()
-        
-        for video in videos:
-            if camera is None or video["camera_id"].lower() == camera.lower():
-                # Almacenar tupla (fecha, camara) para asegurar que la cámara tiene video ese día
-                dates_cameras.add((video["date"], video["camera_id"]))
-                
-        # Organizar por cámara y luego por fecha (más reciente primero)
-        result = {}
-        for date_str, cam_id in dates_cameras:
-            if cam_id not in result:
-                result[cam_id] = []
-            result[cam_id].append(date_str)
-            
-        # Ordenar las fechas dentro de cada cámara
-        for cam_id in result:
-             result[cam_id].sort(reverse=True)
-             
-        return result
+        index = _get_video_index()
+        not_modified = check_not_modified(request, response, f'"{index["etag"]}"')
+        if not_modified:
+            return not_modified
+
+        dates_by_camera = index["dates_by_camera"]
+
+        if camera is None:
+            return dates_by_camera
+
+        # Fechas por cámara (más reciente primero), solo de la cámara pedida
+        return {cam_id: dates for cam_id, dates in dates_by_camera.items()
+                if cam_id.lower() == camera.lower()}
         
     except Exception as e:
         print(f"Error en get_available_dates: {e}")
@@ -160,25 +641,16 @@ async def get_available_dates(camera: str = None):
 
 
 @app.get("/api/videos/by-date")
-async def get_videos_by_date(date: str, camera: str = None):
+async def get_videos_by_date(request: Request, response: Response, date: str, camera: str = None):
     """Obtener videos por fecha específica, opcionalmente filtrados por cámara"""
     try:
-        videos = find_all_video_files()
-        filtered_videos = []
-        
-        for video in videos:
-            if video["date"] == date:
-                if camera is None or video["camera_id"].lower() == camera.lower():
-                    filtered_videos.append({
-                        "camera_id": video["camera_id"],
-                        "date": video["date"],
-                        "filename": video["unique_path"],
-                        "timestamp": video["timestamp_iso"],
-                        "size_mb": video["size_mb"]
-                    })
-        
-        filtered_videos.sort(key=lambda x: x["timestamp"])
-        return filtered_videos
+        index = _get_video_index()
+        not_modified = check_not_modified(request, response, f'"{index["etag"]}"')
+        if not_modified:
+            return not_modified
+
+        cam_key = camera.lower() if camera is not None else None
+        return index["by_date_camera"].get((date, cam_key), [])
         
     except Exception as e:
         print(f"Error en get_videos_by_date: {e}")
@@ -186,40 +658,167 @@ async def get_videos_by_date(date: str, camera: str = None):
 
 
 # ---- ENDPOINTS DE ACCESO A ARCHIVOS ----
-# Estos endpoints necesitan la ruta única para reconstruir la ruta física del archivo.
+# Estos endpoints necesitan la ruta única para obtener la ruta física del archivo.
 
 def get_physical_path(unique_path: str):
-    """Convierte la ruta única (CamX_YYYY-MM-DD__filename.mp4) a la ruta física."""
-    # Reemplazar el separador doble '__' con el separador del sistema ('/' o '\')
-    relative_path = unique_path.replace('__', os.sep)
-    file_path = os.path.join(VIDEO_ROOT_DIR, relative_path)
-    return file_path
+    """Obtiene la ruta física de una ruta única (CamX_YYYY-MM-DD__filename.mp4).
+
+    Se busca en el catálogo de videos escaneados en lugar de reconstruirla a
+    partir del texto, así una ruta como '..__..__etc__passwd' nunca sale del
+    directorio de videos. Devuelve None si el video no está en el catálogo.
+    """
+    return _get_video_index()["by_unique_path"].get(unique_path)
+
+
+# stat() de los videos servidos, cacheado unos segundos por ruta única para no
+# repetirlo en cada petición Range que hace el navegador al buscar en el video
+_STAT_CACHE = {}
+_STAT_CACHE_TTL = 5.0
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+
+def _stat_video(unique_path, file_path):
+    """Devuelve el stat_result del video (cacheado) o None si no es un archivo."""
+    now = time.monotonic()
+    cached = _STAT_CACHE.get(unique_path)
+    if cached is not None and now - cached[0] < _STAT_CACHE_TTL:
+        return cached[1]
+
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        _STAT_CACHE.pop(unique_path, None)
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return None
+
+    # Eliminar las entradas caducadas para que la caché no crezca con cada
+    # video reproducido (incluidos los ya borrados por la retención)
+    for path in [path for path, (ts, _) in _STAT_CACHE.items() if now - ts >= _STAT_CACHE_TTL]:
+        del _STAT_CACHE[path]
+
+    _STAT_CACHE[unique_path] = (now, st)
+    return st
+
+
+def parse_range_header(range_header, file_size):
+    """Parsea una cabecera 'Range: bytes=start-end' de un solo rango.
+
+    Devuelve (start, end) inclusivos, o None si la cabecera no es válida o pide
+    varios rangos (en ese caso se sirve el archivo completo). Lanza 416 si el
+    rango no es satisfacible.
+    """
+    unit, sep, spec = range_header.partition('=')
+    if unit.strip().lower() != 'bytes' or not sep or ',' in spec:
+        return None
+
+    start_str, sep, end_str = spec.strip().partition('-')
+    if not sep or (start_str and not start_str.isdigit()) or (end_str and not end_str.isdigit()):
+        return None
+
+    if start_str:
+        start = int(start_str)
+        # Rango inválido (último < primero): se ignora y se sirve el archivo completo
+        if end_str and int(end_str) < start:
+            return None
+        end = min(int(end_str), file_size - 1) if end_str else file_size - 1
+    elif end_str:
+        # Sufijo: los últimos N bytes
+        suffix = int(end_str)
+        if suffix == 0:
+            raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{file_size}"})
+        start = max(file_size - suffix, 0)
+        end = file_size - 1
+    else:
+        # "bytes=-"
+        return None
+
+    if start >= file_size:
+        raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{file_size}"})
+
+    return start, end
+
+
+def iter_file_range(file_path, start, length, chunk_size=STREAM_CHUNK_SIZE):
+    """Lee 'length' bytes del archivo a partir de 'start', en bloques."""
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
 
 
 @app.get("/api/stream/{unique_path}")
-async def stream_video(unique_path: str):
-    """Servir video para reproducción (usa la ruta única)."""
+async def stream_video(unique_path: str, request: Request):
+    """Servir video para reproducción (usa la ruta única).
+
+    Soporta peticiones Range (206) para poder buscar en el video y cabeceras
+    ETag/Last-Modified para que el navegador pueda revalidar con 304.
+    """
     file_path = get_physical_path(unique_path)
-    
-    if os.path.exists(file_path) and os.path.isfile(file_path):
-        return FileResponse(file_path, media_type="video/mp4")
-    
-    raise HTTPException(status_code=404, detail=f"Video no encontrado: {unique_path}")
+    st = _stat_video(unique_path, file_path) if file_path else None
+
+    if st is None:
+        raise HTTPException(status_code=404, detail=f"Video no encontrado: {unique_path}")
+
+    etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": formatdate(st.st_mtime, usegmt=True),
+    }
+
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    file_size = st.st_size
+    range_header = request.headers.get("range")
+    byte_range = parse_range_header(range_header, file_size) if range_header else None
+
+    if byte_range is None:
+        headers["Content-Length"] = str(file_size)
+        return StreamingResponse(iter_file_range(file_path, 0, file_size),
+                                 media_type="video/mp4", headers=headers)
+
+    start, end = byte_range
+    length = end - start + 1
+    headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+    headers["Content-Length"] = str(length)
+    return StreamingResponse(iter_file_range(file_path, start, length), status_code=206,
+                             media_type="video/mp4", headers=headers)
+
+
+DOWNLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+class DownloadFileResponse(FileResponse):
+    """FileResponse con bloques de 8 MiB (en lugar de 64 KiB) para descargas grandes."""
+    chunk_size = DOWNLOAD_CHUNK_SIZE
 
 
 @app.get("/api/download/{unique_path}")
 async def download_video(unique_path: str):
     """Descargar video (usa la ruta única)."""
     file_path = get_physical_path(unique_path)
+    try:
+        # stat() fresco: el archivo puede seguir creciendo si se está grabando
+        st = os.stat(file_path) if file_path else None
+    except OSError:
+        st = None
     
-    if os.path.exists(file_path) and os.path.isfile(file_path):
-        # Intentar obtener el nombre original del archivo para la descarga
-        original_filename = os.path.basename(unique_path).replace('__', os.sep).split(os.sep)[-1]
+    if st is not None and stat.S_ISREG(st.st_mode):
+        # Nombre original del archivo para la descarga
+        original_filename = os.path.basename(file_path)
         
-        return FileResponse(
+        return DownloadFileResponse(
             file_path,
             media_type="video/mp4",
-            filename=original_filename # Nombre que verá el usuario al descargar
+            filename=original_filename, # Nombre que verá el usuario al descargar
+            stat_result=st
         )
     
     raise HTTPException(status_code=404, detail=f"Video no encontrado: {unique_path}")
@@ -229,7 +828,7 @@ async def download_video(unique_path: str):
 async def debug_info():
     """Endpoint de diagnóstico"""
     try:
-        videos = find_all_video_files()
+        videos = _get_videos_cached()
         
         info = {
             "video_root_directory": VIDEO_ROOT_DIR,
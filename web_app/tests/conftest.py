@@ -0,0 +1,7 @@
+import os
+import sys
+
+# main.py monta 'static' con una ruta relativa: importarlo desde web_app
+WEB_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, WEB_APP_DIR)
+os.chdir(WEB_APP_DIR)
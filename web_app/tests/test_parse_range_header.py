@@ -0,0 +1,59 @@
+import pytest
+from fastapi import HTTPException
+
+from main import parse_range_header
+
+FILE_SIZE = 1000
+
+
+@pytest.mark.parametrize("header, expected", [
+    # Rango cerrado
+    ("bytes=0-99", (0, 99)),
+    ("bytes=10-19", (10, 19)),
+    # Rango abierto: hasta el final
+    ("bytes=500-", (500, 999)),
+    # El final se recorta al tamaño del archivo
+    ("bytes=900-5000", (900, 999)),
+    # Sufijo: los últimos N bytes
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    # Unidad sin distinguir mayúsculas y espacios alrededor
+    ("Bytes= 0-0", (0, 0)),
+])
+def test_valid_ranges(header, expected):
+    assert parse_range_header(header, FILE_SIZE) == expected
+
+
+@pytest.mark.parametrize("header", [
+    # Último < primero: se ignora (RFC 9110) y se sirve el archivo completo
+    "bytes=5-3",
+    # Varios rangos: no soportado, se sirve el archivo completo
+    "bytes=0-9,20-29",
+    # Sintaxis inválida
+    "bytes=abc-def",
+    "bytes=+5-10",
+    "bytes=-",
+    "bytes=10",
+    "items=0-9",
+    "bytes",
+])
+def test_ignored_ranges(header):
+    assert parse_range_header(header, FILE_SIZE) is None
+
+
+@pytest.mark.parametrize("header", [
+    "bytes=1000-",
+    "bytes=1000-2000",
+    "bytes=-0",
+])
+def test_unsatisfiable_ranges(header):
+    with pytest.raises(HTTPException) as exc_info:
+        parse_range_header(header, FILE_SIZE)
+    assert exc_info.value.status_code == 416
+    assert exc_info.value.headers["Content-Range"] == f"bytes */{FILE_SIZE}"
+
+
+def test_empty_file_is_unsatisfiable():
+    with pytest.raises(HTTPException) as exc_info:
+        parse_range_header("bytes=0-", 0)
+    assert exc_info.value.status_code == 416